@@ -2,8 +2,6 @@
 Author: Duncan Hunter
 """
 from pipemesh import pipes, pieces, gmsh
-import os
-import numpy as np
 
 model = gmsh.model
 factory = model.occ
@@ -79,4 +77,4 @@ and generate."""
 #     network.add_curve([1, 0, -0.25], 1, 0.1)
 
 
-# network.generate(filename=None, binary=False, write_info=False, write_xml=False, run_gui=True)
+# network.generate(filename=None, write_info=False, write_xml=False, run_gui=True)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Numeric kernels for network-level bookkeeping.
+
+Compiled with numba when it is installed, following the same
+optional-dependency pattern as the rotation maths in pieces; without
+numba the NumPy fallbacks run instead.
+"""
+import numpy as np
+
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
+
+
+def _match_centres_py(locs, refs, tols2):
+    """NumPy fallback of match_centres: one broadcast pass."""
+    dists2 = ((locs[:, None, :] - refs[None, :, :])**2).sum(axis=2)
+    best = dists2.argmin(axis=1)
+    matched = dists2[np.arange(locs.shape[0]), best] < tols2[best]
+    return np.where(matched, best, -1)
+
+
+if _njit is None:
+    match_centres = _match_centres_py
+else:
+
+    @_njit(cache=True)
+    def match_centres(locs, refs, tols2):
+        """Matches each loc to the nearest ref within tolerance.
+
+        Args:
+            locs: (np.array shape (m, 3)) centres to classify.
+            refs: (np.array shape (k, 3)) known reference centres.
+            tols2: (np.array shape (k,)) squared distance tolerance
+                per reference.
+
+        Returns:
+            (np.array shape (m,), int64) index into refs for each
+            loc, or -1 where nothing lies within tolerance. Ties go
+            to the earlier reference.
+        """
+        out = np.full(locs.shape[0], -1, np.int64)
+        for i in range(locs.shape[0]):
+            best = -1
+            best_dist2 = np.inf
+            for j in range(refs.shape[0]):
+                dist2 = ((locs[i, 0] - refs[j, 0])**2 +
+                         (locs[i, 1] - refs[j, 1])**2 +
+                         (locs[i, 2] - refs[j, 2])**2)
+                if dist2 < best_dist2:
+                    best_dist2 = dist2
+                    best = j
+            if best_dist2 < tols2[best]:
+                out[i] = best
+        return out
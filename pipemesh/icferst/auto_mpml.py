@@ -6,17 +6,155 @@ the set_methods to set options. Then use write to generate the file.
 MPML files generated will only work with latest version of IC-FERST.
 Contact author if you want support for older versions.
 """
-import xml.etree.ElementTree as ET
+try:
+    from lxml import etree as ET
+    _USING_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _USING_LXML = False
 import copy
+import io
 import os
 LOC = os.path.dirname(os.path.abspath(__file__))
 
 
+def _compile_path(path):
+    """Compiles an element lookup for a structural path.
+
+    Under lxml this returns a compiled XPath object, which dispatches
+    in C. The ElementTree fallback wraps findall with the same call
+    signature, so both return a list of matching elements. The result
+    is stored as a class attribute, so the fallback must not be a
+    plain function: attribute access would bind it as a method and
+    pass the instance instead of the root. staticmethod keeps the
+    lookup a bare callable under both backends.
+    """
+    if _USING_LXML:
+        return ET.XPath(path)
+
+    def _find(root, _path=path):
+        return root.findall(_path)
+
+    return staticmethod(_find)
+
+
+def _set_vec_comp(elem, velo):
+    """Sets the xyz components of an align_bc_with_cartesian element."""
+    x_comp, y_comp, z_comp = elem
+    x_comp[0][0].text = str(velo[0])
+    y_comp[0][0].text = str(velo[1])
+    z_comp[0][0].text = str(velo[2])
+
+
+def _set_velo(i1_elem, i1_mom_elem, i1_ad_elem, phys_id, velocity):
+    """Sets one inlet's boundary condition elements.
+
+    Elements are boundary_conditions, name=inlet and its momentum and
+    advection counterparts.
+    """
+    i1_elem.attrib['name'] = "inlet_{}".format(phys_id)
+    i1_elem[0][0].text = str(phys_id)
+    _set_vec_comp(i1_elem[1][1], velocity)
+
+    i1_mom_elem.attrib['name'] = "inlet_{}_mom".format(phys_id)
+    i1_mom_elem[0][0].text = str(phys_id)
+    _set_vec_comp(i1_mom_elem[1][0], velocity)
+
+    i1_ad_elem.attrib['name'] = "inlet_{}_ad".format(phys_id)
+    i1_ad_elem[0][0].text = str(phys_id)
+    _set_vec_comp(i1_ad_elem[1][1], velocity)
+
+
+def _ani_sym_matrix_text(value):
+    """Returns the text of an isotropic anisotropic_symmetric matrix."""
+    return f"{value} 0.0 0.0 0.0 {value} 0.0 0.0 0.0 {value}"
+
+
+def iter_elements(path, tag):
+    """Iterates over elements with the given tag in the file at path.
+
+    Streams the file with iterparse and clears each element after it
+    has been yielded, so peak memory stays bounded however large the
+    file is. Use this to scan big mpml or result XML files without
+    loading the full tree.
+
+    Args:
+        path: (string) location of the XML file to scan.
+        tag: (string) tag of the elements to yield.
+    """
+    for _, elem in ET.iterparse(path, events=('end',)):
+        if elem.tag == tag:
+            yield elem
+            elem.clear()
+
+# Parse the static template once at import. Instances copy the parsed
+# tree, which is much cheaper than re-reading the file every time.
+_TEMPLATE_TREE = ET.parse(os.path.join(LOC, "3d_pipe_FEM.mpml"))
+_TEMPLATE_ROOT = _TEMPLATE_TREE.getroot()
+
+
 class AutoMPML():
+    # Lookups for the elements the setters edit, compiled once at class
+    # load. Positional predicates are used where names are rewritten by
+    # the setters (the velocity boundary conditions).
+    _XP_SIM_NAME = _compile_path('./simulation_name/string_value')
+    _XP_MSH_FILE = _compile_path('./geometry/mesh[@name="CoordinateMesh"]'
+                                 '/from_file')
+    _XP_DUMP_PERIOD = _compile_path('./io/dump_period/constant/real_value')
+    _XP_DUMP_IDS = _compile_path(
+        './io/dump_boundaryflux/surface_ids/integer_value')
+    _XP_TIMESTEP = _compile_path('./timestepping/timestep/real_value')
+    _XP_FINISH_TIME = _compile_path('./timestepping/finish_time/real_value')
+    _XP_CFL = _compile_path(
+        './timestepping/adaptive_timestep/requested_cfl/real_value')
+    _XP_DENSITY = _compile_path('./material_phase/phase_properties/Density'
+                                '/incompressible/real_value')
+    _XP_VISCOSITY = _compile_path(
+        './material_phase/phase_properties/Viscosity/tensor_field/prescribed'
+        '/value/isotropic/constant/real_value')
+    _XP_OUTLET_IDS = _compile_path(
+        './material_phase/scalar_field[@name="Pressure"]/prognostic'
+        '/boundary_conditions/surface_ids/integer_value')
+    _XP_VELO_PROG = _compile_path(
+        './material_phase/vector_field[@name="Velocity"]/prognostic')
+    _XP_INLET = _compile_path(
+        './material_phase/vector_field[@name="Velocity"]/prognostic'
+        '/boundary_conditions[1]')
+    _XP_INLET_MOM = _compile_path(
+        './material_phase/vector_field[@name="Velocity"]/prognostic'
+        '/boundary_conditions[2]')
+    _XP_INLET_AD = _compile_path(
+        './material_phase/vector_field[@name="Velocity"]/prognostic'
+        '/boundary_conditions[3]')
+    _XP_CYL_MOM = _compile_path(
+        './material_phase/vector_field[@name="Velocity"]/prognostic'
+        '/boundary_conditions[4]')
+    _XP_CYL_NS_VISC = _compile_path(
+        './material_phase/vector_field[@name="Velocity"]/prognostic'
+        '/boundary_conditions[5]')
+    _XP_CYL = _compile_path(
+        './material_phase/vector_field[@name="Velocity"]/prognostic'
+        '/boundary_conditions[6]')
+    _XP_MAX_NO_NODES = _compile_path(
+        './mesh_adaptivity/hr_adaptivity/maximum_number_of_nodes'
+        '/integer_value')
+    _XP_MIN_SIZE = _compile_path(
+        './mesh_adaptivity/hr_adaptivity'
+        '/tensor_field[@name="MinimumEdgeLengths"]/anisotropic_symmetric'
+        '/constant/real_value')
+    _XP_MAX_SIZE = _compile_path(
+        './mesh_adaptivity/hr_adaptivity'
+        '/tensor_field[@name="MaximumEdgeLengths"]/anisotropic_symmetric'
+        '/constant/real_value')
+    _XP_ASPECT_RATIO = _compile_path(
+        './mesh_adaptivity/hr_adaptivity'
+        '/tensor_field[@name="MaximumEdgeLengths"]/anisotropic_symmetric')
+    _XP_T_ADAPT_DELAY = _compile_path(
+        './mesh_adaptivity/hr_adaptivity/aspect_ratio_bound/real_value')
+
     def __init__(self):
-        fname = LOC + "/3d_pipe_FEM.mpml"
-        self.mpml_tree = ET.parse(fname)
-        self.mpml_root = self.mpml_tree.getroot()
+        self.mpml_root = copy.deepcopy(_TEMPLATE_ROOT)
+        self.mpml_tree = ET.ElementTree(self.mpml_root)
 
         self.sim_name = self.mpml_root[0]
         self.msh_options = self.mpml_root[2]
@@ -25,6 +163,33 @@ class AutoMPML():
         self.material_phase = self.mpml_root[6]
         self.mesh_adaptivity = self.mpml_root[7]
 
+        # Resolve every element the setters edit once per instance, so
+        # each setter call is a plain attribute access instead of a
+        # tree walk.
+        root = self.mpml_root
+        self._sim_name_elem = self._XP_SIM_NAME(root)[0]
+        self._msh_file_elem = self._XP_MSH_FILE(root)[0]
+        self._dump_period_elem = self._XP_DUMP_PERIOD(root)[0]
+        self._dump_ids_elem = self._XP_DUMP_IDS(root)[0]
+        self._timestep_elem = self._XP_TIMESTEP(root)[0]
+        self._finish_time_elem = self._XP_FINISH_TIME(root)[0]
+        self._cfl_elem = self._XP_CFL(root)[0]
+        self._density_elem = self._XP_DENSITY(root)[0]
+        self._viscosity_elem = self._XP_VISCOSITY(root)[0]
+        self._outlet_ids_elem = self._XP_OUTLET_IDS(root)[0]
+        self._velo_prognostic = self._XP_VELO_PROG(root)[0]
+        self._inlet_bc = self._XP_INLET(root)[0]
+        self._inlet_mom_bc = self._XP_INLET_MOM(root)[0]
+        self._inlet_ad_bc = self._XP_INLET_AD(root)[0]
+        self._cyl_conds = (self._XP_CYL_MOM(root)[0],
+                           self._XP_CYL_NS_VISC(root)[0],
+                           self._XP_CYL(root)[0])
+        self._max_no_nodes_elem = self._XP_MAX_NO_NODES(root)[0]
+        self._min_size_elem = self._XP_MIN_SIZE(root)[0]
+        self._max_size_elem = self._XP_MAX_SIZE(root)[0]
+        self._aspect_ratio_elem = self._XP_ASPECT_RATIO(root)[0]
+        self._t_adapt_delay_elem = self._XP_T_ADAPT_DELAY(root)[0]
+
     def set_all(self,
                 sim_name=None,
                 msh_file="src/pipe",
@@ -43,14 +208,25 @@ class AutoMPML():
                 max_mesh_size=0.5,
                 max_no_nodes=3e5,
                 t_adapt_delay=0.5,
-                aspect_ratio=0.5):
+                aspect_ratio=0.5,
+                validate=True):
         """Sets all of the options at once.
 
-        See base functions for information on what each option sets."""
+        See base functions for information on what each option sets.
+
+        Args:
+            validate: (Bool) run the range checks and warnings in the
+                setters. Set False in sweeps whose inputs are already
+                validated to skip the checks and prints.
+        """
+        skip = not validate
         self.set_sim_name(sim_name)
         self.set_msh_options(msh_file)
-        self.set_io_options(dump_period, dump_ids)
-        self.set_timestepping(finish_time, timestep, cfl_no)
+        self.set_io_options(dump_period, dump_ids, _skip_validate=skip)
+        self.set_timestepping(finish_time,
+                              timestep,
+                              cfl_no,
+                              _skip_validate=skip)
         self.set_material_properties(density, viscosity)
         self.set_inlets(inlet_phys_ids, inlet_velocities)
         self.set_outlets(outlet_phys_ids)
@@ -63,7 +239,7 @@ class AutoMPML():
 
         Default is "3d_pipe".
         """
-        self.sim_name[0].text = simname
+        self._sim_name_elem.text = simname
 
     def set_msh_options(self, msh_file):
         """Sets the location of the msh_file.
@@ -71,29 +247,25 @@ class AutoMPML():
         Default is src/pipe.
         Args:
             msh_file: (string) location .msh file is stored."""
-        mesh = self.msh_options[1]
-        mesh[0].attrib['file_name'] = msh_file
+        self._msh_file_elem.attrib['file_name'] = msh_file
 
-    def set_io_options(self, dump_period=0.1, dump_ids=[]):
+    def set_io_options(self, dump_period=0.1, dump_ids=[],
+                       _skip_validate=False):
         """Sets the input/output settings.
 
         Args:
             dump_period: How often to dump vtu files.
             dump_ids: Physical surfaces to record fluxes.
         """
-        if dump_period < 0.1:
+        if not _skip_validate and dump_period < 0.1:
             print("Warning: dump period is less than maximum timestep.")
-        dump_period = str(dump_period)
-        dump_p = self.io_options[1][0][0]
-        dump_p.text = str(dump_period)
-        text = str(dump_ids[0])
-        for i in dump_ids[1:]:
-            text += " {}".format(i)
-        dump_id = self.io_options[2][0][0]
+        self._dump_period_elem.text = str(dump_period)
+        dump_id = self._dump_ids_elem
         dump_id.attrib['shape'] = str(len(dump_ids))
-        dump_id.text = text
+        dump_id.text = ' '.join(map(str, dump_ids))
 
-    def set_timestepping(self, finish_time, timestep=0.005, cfl_no=2.0):
+    def set_timestepping(self, finish_time, timestep=0.005, cfl_no=2.0,
+                         _skip_validate=False):
         """Sets the timestepping options.
 
         Args:
@@ -101,19 +273,20 @@ class AutoMPML():
             timestep: Initial timestep.
             cfl_no: CFL number adaptive timestepping aims for.
         """
-        tstep = self.timestepping[1][0]
+        tstep = self._timestep_elem
         tstep.text = str(timestep)
-        ftime = self.timestepping[2][0]
+        ftime = self._finish_time_elem
         ftime.text = str(finish_time)
 
-        if cfl_no > 4:
-            raise ValueError("CFL number too high")
-        if cfl_no > 2:
-            print("Warning: High CFL number")
-        elif cfl_no <= 0:
-            raise ValueError("CFL number too low")
+        if not _skip_validate:
+            if cfl_no > 4:
+                raise ValueError("CFL number too high")
+            if cfl_no > 2:
+                print("Warning: High CFL number")
+            elif cfl_no <= 0:
+                raise ValueError("CFL number too low")
 
-        cfl = self.timestepping[3][0][0]
+        cfl = self._cfl_elem
         cfl.text = str(cfl_no)
 
     def set_material_properties(self, density=1e3, viscosity=1e-3):
@@ -123,9 +296,9 @@ class AutoMPML():
             density: density of the fluid.
             viscosity: viscosity of the fluid.
         """
-        density_o = self.material_phase[0][0][0][0]
+        density_o = self._density_elem
         density_o.text = str(density)
-        viscosity_o = self.material_phase[0][1][0][0][0][0][0][0]
+        viscosity_o = self._viscosity_elem
         viscosity_o.text = str(viscosity)
 
     def set_inlets(self, phys_ids, velocities):
@@ -138,31 +311,15 @@ class AutoMPML():
                 phys_ids[0]. If not enough vectors are given, the first vector
                 is used for all inlets.
         """
-
-        def set_velo(i1_elem, i1_mom_elem, i1_ad_elem, phys_id, velocity):
-            """eleme is boundary_conditions, name=inlet."""
-
-            def set_vec_comp(elem, velo):
-                for i in range(3):
-                    elem[i][0][0].text = str(velo[i])
-
-            i1_elem.attrib['name'] = "inlet_{}".format(phys_id)
-            i1_elem[0][0].text = str(phys_id)
-            set_vec_comp(i1_elem[1][1], velocity)
-
-            i1_mom_elem.attrib['name'] = "inlet_{}_mom".format(phys_id)
-            i1_mom_elem[0][0].text = str(phys_id)
-            set_vec_comp(i1_mom_elem[1][0], velocity)
-
-            i1_ad_elem.attrib['name'] = "inlet_{}_ad".format(phys_id)
-            i1_ad_elem[0][0].text = str(phys_id)
-            set_vec_comp(i1_ad_elem[1][1], velocity)
-
-        velo = self.material_phase[2]
+        prognostic = self._velo_prognostic
+        # Template subtrees. Copies are appended at the end of
+        # prognostic, so these stay valid across the loop.
+        inlet = self._inlet_bc
+        inlet_mom = self._inlet_mom_bc
+        inlet_ad = self._inlet_ad_bc
 
         n_inlets = len(phys_ids)
-        set_velo(velo[0][2], velo[0][3], velo[0][4], phys_ids[0],
-                 velocities[0])
+        _set_velo(inlet, inlet_mom, inlet_ad, phys_ids[0], velocities[0])
         if n_inlets > 1:
             if len(velocities) < n_inlets:
                 print(
@@ -170,13 +327,13 @@ class AutoMPML():
                 )
                 velocities = [velocities[0]] * n_inlets
             for phys_id, velocity in zip(phys_ids[1:], velocities[1:]):
-                i1_copy = copy.deepcopy(velo[0][2])
-                i1_mom_copy = copy.deepcopy(velo[0][3])
-                i1_ad_copy = copy.deepcopy(velo[0][4])
-                set_velo(i1_copy, i1_mom_copy, i1_ad_copy, phys_id, velocity)
-                velo[0].append(i1_copy)
-                velo[0].append(i1_mom_copy)
-                velo[0].append(i1_ad_copy)
+                i1_copy = copy.deepcopy(inlet)
+                i1_mom_copy = copy.deepcopy(inlet_mom)
+                i1_ad_copy = copy.deepcopy(inlet_ad)
+                _set_velo(i1_copy, i1_mom_copy, i1_ad_copy, phys_id, velocity)
+                prognostic.append(i1_copy)
+                prognostic.append(i1_mom_copy)
+                prognostic.append(i1_ad_copy)
 
     def set_outlets(self, phys_ids):
         """Sets the outlet surfaces.
@@ -186,13 +343,9 @@ class AutoMPML():
         Args:
             phys_ids: The physical surfaces to set to 0 pressure.
         """
-        pressure = self.material_phase[1]
-        out_ids = pressure[0][2][0][0]
+        out_ids = self._outlet_ids_elem
         out_ids.attrib['shape'] = str(len(phys_ids))
-        text = str(phys_ids[0])
-        for i in phys_ids[1:]:
-            text += " {}".format(int(i))
-        out_ids.text = text
+        out_ids.text = ' '.join(str(int(i)) for i in phys_ids)
 
     def set_no_slip(self, phys_ids):
         """Sets the no-slip boundary condition.
@@ -200,14 +353,9 @@ class AutoMPML():
         Args:
             phys_ids: The physical surfaces to set to no-slip.
         """
-        cyl_mom = self.material_phase[2][0][5]
-        cyl_ns_visc = self.material_phase[2][0][6]
-        cyl = self.material_phase[2][0][7]
-        text = str(phys_ids[0])
-        for i in phys_ids[1:]:
-            text += " {}".format(int(i))
-
-        for cond in [cyl_mom, cyl_ns_visc, cyl]:
+        text = ' '.join(str(int(i)) for i in phys_ids)
+
+        for cond in self._cyl_conds:
             out_ids = cond[0][0]
             out_ids.attrib['shape'] = str(len(phys_ids))
             out_ids.text = text
@@ -227,23 +375,61 @@ class AutoMPML():
             t_adapt_delay: Start adaptive meshing at this time.
             aspect_ratio: Limit the mesh shape to maximum this aspect ratio.
         """
-        mnn = self.mesh_adaptivity[0][1][0]
+        mnn = self._max_no_nodes_elem
         mnn.text = str(int(max_no_nodes))
 
-        def ani_sym_matrix_text(value):
-            text = "{} 0.0 0.0 0.0 {} 0.0 0.0 0.0 {}".format(
-                value, value, value)
-            return text
-
-        min_s = self.mesh_adaptivity[0][3][0][0][0]
-        min_s.text = ani_sym_matrix_text(min_size)
-        max_s = self.mesh_adaptivity[0][4][0][0][0]
-        max_s.text = ani_sym_matrix_text(max_size)
-        asp_ratio = self.mesh_adaptivity[0][4][0]
+        min_s = self._min_size_elem
+        min_s.text = _ani_sym_matrix_text(min_size)
+        max_s = self._max_size_elem
+        max_s.text = _ani_sym_matrix_text(max_size)
+        asp_ratio = self._aspect_ratio_elem
         asp_ratio.text = str(aspect_ratio)
-        t_a_d = self.mesh_adaptivity[0][5][0]
+        t_a_d = self._t_adapt_delay_elem
         t_a_d.text = str(t_adapt_delay)
 
-    def write_mpml(self, fname):
-        """Writes the settings to fname.mpml."""
-        self.mpml_tree.write(fname + ".mpml", 'utf-8', xml_declaration=True)
+    def write_mpml(self, fname, fsync=False):
+        """Writes the settings to fname.mpml.
+
+        The file is written under a temporary name and renamed into
+        place, so an interrupted sweep never leaves a half-written
+        mpml behind.
+
+        Args:
+            fname: (string) location to write to, without extension.
+            fsync: (Bool) force the data to disk before the rename.
+                Leave off for batches; a sync per file dominates on
+                network filesystems.
+        """
+        data = ET.tostring(self.mpml_root,
+                           encoding='UTF-8',
+                           xml_declaration=True)
+        tmp_name = fname + ".mpml.tmp"
+        with open(tmp_name, 'wb') as out:
+            out.write(data)
+            if fsync:
+                out.flush()
+                os.fsync(out.fileno())
+        os.replace(tmp_name, fname + ".mpml")
+
+    @staticmethod
+    def write_many(items):
+        """Writes many option sets, reusing one serialisation buffer.
+
+        Serialises each tree into a shared in-memory buffer and dumps
+        it to disk with a single write per file, which is cheaper than
+        per-call serialiser setup when a sweep emits hundreds of mpml
+        files.
+
+        Args:
+            items: iterable of (AutoMPML, fname) pairs. Each option
+                set is written to fname.mpml.
+        """
+        buf = io.BytesIO()
+        for options, fname in items:
+            buf.seek(0)
+            buf.truncate()
+            options.mpml_tree.write(buf,
+                                    encoding='utf-8',
+                                    xml_declaration=True)
+            with open(fname + ".mpml", 'wb') as out:
+                out.write(buf.getbuffer())
@@ -8,18 +8,54 @@ Author: Duncan Hunter
 # pylint: disable=C0411
 # pylint: disable=R0913
 from pipemesh import gmsh
+import math
 import numpy as np
-from scipy.spatial.transform import Rotation
+
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
 
 MODEL = gmsh.model
 FACTORY = MODEL.occ
 MESH = MODEL.mesh
 
+# Shared constant vectors, so the rotation helpers do not reallocate
+# them for every piece. Treated as read-only.
+_UP = np.array([0.0, 0.0, 1.0])
+_XAXIS = np.array([1.0, 0.0, 0.0])
+
+
+def _maybe_jit(func):
+    """Compiles a numeric helper with numba when it is installed.
+
+    The decorated helpers are pure float maths on length-3 arrays, so
+    they compile unchanged; without numba they run as plain Python.
+    """
+    if _njit is None:
+        return func
+    return _njit(cache=True, fastmath=True)(func)
+
 
 def vec_angle(vec1, vec2):
     """Returns the angle between two numpy array vectors"""
-    return np.arccos(
-        np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+    # Scalar arithmetic: np.linalg.norm/np.dot dispatch overhead
+    # dwarfs the handful of flops needed on these small vectors.
+    dot = 0.0
+    norm1 = 0.0
+    norm2 = 0.0
+    for comp1, comp2 in zip(vec1, vec2):
+        dot += comp1 * comp2
+        norm1 += comp1 * comp1
+        norm2 += comp2 * comp2
+    cos_angle = dot / math.sqrt(norm1 * norm2)
+    # Clamp against rounding overshoot, which would make acos raise
+    # for (anti)parallel vectors.
+    if cos_angle > 1.0:
+        cos_angle = 1.0
+    elif cos_angle < -1.0:
+        cos_angle = -1.0
+    return math.acos(cos_angle)
 
 
 def proj(vec1, vec2):
@@ -29,55 +65,226 @@ def proj(vec1, vec2):
     Args:
         vec1, vec2: (np.array shape 3) xyz vector.
     """
-    return np.dot(vec1, vec2) / np.linalg.norm(vec2)
+    dot = 0.0
+    norm2 = 0.0
+    for comp1, comp2 in zip(vec1, vec2):
+        dot += comp1 * comp2
+        norm2 += comp2 * comp2
+    return dot / math.sqrt(norm2)
+
+
+def _unit(vec):
+    """Returns vec scaled to unit length as a float64 array."""
+    vec = np.asarray(vec, dtype=np.float64)
+    norm = math.sqrt(vec[0] * vec[0] + vec[1] * vec[1] + vec[2] * vec[2])
+    return vec / norm
+
+
+def _com(dimtag):
+    """Returns the centre of mass of dimtag as a float64 array."""
+    return np.asarray(FACTORY.getCenterOfMass(*dimtag), dtype=np.float64)
+
+
+@_maybe_jit
+def _cross3(vec1, vec2):
+    """Returns the cross product of two 3-vectors.
+
+    np.cross spends most of its time on axis parsing and broadcasting
+    for this fixed-size case.
+    """
+    return np.array((vec1[1] * vec2[2] - vec1[2] * vec2[1],
+                     vec1[2] * vec2[0] - vec1[0] * vec2[2],
+                     vec1[0] * vec2[1] - vec1[1] * vec2[0]))
+
+
+@_maybe_jit
+def _rodrigues(vec, axis, angle):
+    """Rotates vec by angle about the unit vector axis.
+
+    Direct Rodrigues formula; building a scipy Rotation for a single
+    3-vector costs far more than the formula itself.
+
+    Args:
+        vec: (np.array shape 3) xyz vector to rotate.
+        axis: (np.array shape 3) unit rotation axis.
+        angle: (float) rotation angle in radians.
+    """
+    cos_a = math.cos(angle)
+    sin_a = math.sin(angle)
+    dot = axis[0] * vec[0] + axis[1] * vec[1] + axis[2] * vec[2]
+    return vec * cos_a + _cross3(axis, vec) * sin_a + axis * (dot *
+                                                              (1 - cos_a))
+
+
+def _rodrigues_stack(vecs, axis, angle):
+    """Rotates each row of vecs by angle about the unit vector axis.
+
+    Vectorized Rodrigues formula, so a piece's surface directions (or
+    a whole network's) rotate in one NumPy call.
+
+    Args:
+        vecs: (np.array shape (n, 3)) xyz vectors to rotate.
+        axis: (np.array shape 3) unit rotation axis.
+        angle: (float) rotation angle in radians.
+    """
+    cos_a = math.cos(angle)
+    sin_a = math.sin(angle)
+    dots = vecs @ axis
+    return (vecs * cos_a + np.cross(axis, vecs) * sin_a +
+            np.outer(dots * (1 - cos_a), axis))
+
 
+@_maybe_jit
+def _rotate_inlet_math(in_direction, out_direction):
+    """Numeric core of _rotate_inlet, split out so it can be jitted.
 
-def _rotate_inlet(vol_tag, in_direction, out_direction):
+    Args:
+        in_direction: xyz array unit direction to rotate the inlet to.
+        out_direction: Direction the outlet is facing before
+            rotation.
+
+    Returns:
+        (rotate, rotate_axis, rotate_angle, new_out_direction) where
+        rotate is False if the inlet already faces up and no rotation
+        is needed.
+    """
+    # Only have to rotate if its not facing up. Scalar tolerance
+    # checks; np.allclose is pure dispatch overhead on 3-vectors.
+    diff_x = in_direction[0]
+    diff_y = in_direction[1]
+    diff_z = in_direction[2] - 1.0
+    if diff_x * diff_x + diff_y * diff_y + diff_z * diff_z <= 1e-16:
+        return False, _XAXIS, 0.0, out_direction
+    # Find rotation axis
+    rotate_axis = _cross3(_UP, in_direction)
+    norm_sq = (rotate_axis[0] * rotate_axis[0] +
+               rotate_axis[1] * rotate_axis[1] +
+               rotate_axis[2] * rotate_axis[2])
+    if norm_sq < 1e-16:
+        # If directions are parallel, set arbitrary rotate axis
+        rotate_axis = _XAXIS
+    else:
+        # Normalise axis for accurate rotation
+        rotate_axis = rotate_axis / math.sqrt(norm_sq)
+    # in_direction is unit length, so the angle to up is just
+    # acos of the z component, clamped against rounding overshoot.
+    cos_angle = in_direction[2]
+    if cos_angle > 1.0:
+        cos_angle = 1.0
+    elif cos_angle < -1.0:
+        cos_angle = -1.0
+    rotate_angle = math.acos(cos_angle)
+    # Rotate out direction analytically
+    new_out_direction = _rodrigues(out_direction, rotate_axis, rotate_angle)
+    return True, rotate_axis, rotate_angle, new_out_direction
+
+
+def rotate_surfaces(surfaces, axis, angle):
+    """Rotates the directions of many surfaces in one stacked call.
+
+    Gathers the directions into an (n, 3) block, applies the
+    vectorized Rodrigues formula once and scatters the rows back, so
+    a network-wide rotation does not pay one rotation call per piece.
+
+    Args:
+        surfaces: (list of Surface) surfaces to update.
+        axis: (np.array shape 3) unit rotation axis.
+        angle: (float) rotation angle in radians.
+    """
+    directions = np.stack([surface.direction for surface in surfaces])
+    new_directions = _rodrigues_stack(directions, axis, angle)
+    for index, surface in enumerate(surfaces):
+        surface.direction = new_directions[index]
+
+
+def _rotate_inlet(vol_tag, in_direction, out_direction, sync=True):
     """Rotates up facing inlet to face in_direction.
 
     Calculates the new outlet direction after it has been
-    transformed.
+    transformed. The maths lives in _rotate_inlet_math; this driver
+    only talks to GMSH.
 
     Args:
         vol_tag: dimtag tuple of volume being rotated.
-        in_direction: xyz array direction to rotate the inlet to.
+        in_direction: xyz array unit direction to rotate the inlet to.
         out_direction: Direction the outlet is facing before
             rotation.
+        sync: (bool) synchronize the factory after rotating. Callers
+            that rotate again straight away pass False and synchronize
+            once themselves.
 
     Returns:
         new_out_direction: Direction outlet is facing after
             rotation as xyz array.
     """
-    up_vector = np.array([0, 0, 1])
-    # only have to rotate if its not facing up
-    if np.allclose(in_direction, up_vector) is False:
-        # Find rotation axis
-        rotate_axis = np.cross(up_vector, in_direction)
-        # If directions are parallel, set arbitrary rotate axis
-        if np.allclose(rotate_axis, np.zeros(3)):
-            rotate_axis = np.array([1, 0, 0])
-        # Normalise axis for accurate scipy rotation
-        rotate_axis = rotate_axis / np.linalg.norm(rotate_axis)
-        rotate_angle = vec_angle(in_direction, up_vector)
-        # GMSH rotation
-        FACTORY.rotate([vol_tag], *[0, 0, 0], *list(rotate_axis), rotate_angle)
-        FACTORY.synchronize()
-        # Rotate out direction with scipy
-        rot_vec = rotate_angle * rotate_axis
-        rot1 = Rotation.from_rotvec(rot_vec)
-        new_out_direction = rot1.apply(out_direction)
-    else:
-        new_out_direction = out_direction
+    rotate, rotate_axis, rotate_angle, new_out_direction = _rotate_inlet_math(
+        in_direction, out_direction)
+    if rotate:
+        FACTORY.rotate([vol_tag], 0, 0, 0, rotate_axis[0], rotate_axis[1],
+                       rotate_axis[2], rotate_angle)
+        if sync:
+            FACTORY.synchronize()
     return new_out_direction
 
 
-def _rotate_outlet(vol_tag, out_direction, in_direction, new_out_direction):
+@_maybe_jit
+def _rotate_outlet_math(out_direction, in_direction, new_out_direction):
+    """Numeric core of _rotate_outlet, split out so it can be jitted.
+
+    Projects new_out_direction and out_direction onto basis axes that
+    are perpendicular to each other and in_direction, and returns the
+    signed angle between the projections.
+    """
+    basis_1 = _cross3(
+        out_direction, in_direction
+    )  # basis vectors perpendicular to direction (rotation axis)
+    basis_2 = _cross3(basis_1,
+                      in_direction)  # and perpendicular to other basis
+    norm_1 = math.sqrt(basis_1[0] * basis_1[0] + basis_1[1] * basis_1[1] +
+                       basis_1[2] * basis_1[2])
+    norm_2 = math.sqrt(basis_2[0] * basis_2[0] + basis_2[1] * basis_2[1] +
+                       basis_2[2] * basis_2[2])
+    # Before rotation projection.
+    alpha_1 = (basis_1[0] * new_out_direction[0] +
+               basis_1[1] * new_out_direction[1] +
+               basis_1[2] * new_out_direction[2]) / norm_1
+    alpha_2 = (basis_2[0] * new_out_direction[0] +
+               basis_2[1] * new_out_direction[1] +
+               basis_2[2] * new_out_direction[2]) / norm_2
+    # After rotation projection.
+    beta_1 = (basis_1[0] * out_direction[0] + basis_1[1] * out_direction[1] +
+              basis_1[2] * out_direction[2]) / norm_1
+    beta_2 = (basis_2[0] * out_direction[0] + basis_2[1] * out_direction[1] +
+              basis_2[2] * out_direction[2]) / norm_2
+    # Find angle between two vectors in bases.
+    cos_angle = ((alpha_1 * beta_1 + alpha_2 * beta_2) /
+                 math.sqrt((alpha_1 * alpha_1 + alpha_2 * alpha_2) *
+                           (beta_1 * beta_1 + beta_2 * beta_2)))
+    if cos_angle > 1.0:
+        cos_angle = 1.0
+    elif cos_angle < -1.0:
+        cos_angle = -1.0
+    rot2_angle = math.acos(cos_angle)
+    # Find direction to rotate in: the scalar triple product
+    # in_direction . (new_out_direction x out_direction), expanded so
+    # no intermediate cross-product array is built.
+    triple = (in_direction[0] * (new_out_direction[1] * out_direction[2] -
+                                 new_out_direction[2] * out_direction[1]) +
+              in_direction[1] * (new_out_direction[2] * out_direction[0] -
+                                 new_out_direction[0] * out_direction[2]) +
+              in_direction[2] * (new_out_direction[0] * out_direction[1] -
+                                 new_out_direction[1] * out_direction[0]))
+    if triple > 0:
+        rot2_angle = -rot2_angle
+    return rot2_angle
+
+
+def _rotate_outlet(vol_tag, out_direction, in_direction, new_out_direction,
+                   sync=True):
     """Rotates outlet about in_direction to face out_direction.
 
-        Projects new_out_direction and out_direction onto basis axes
-        that are perpendicular to each other and in_direction. The
-        angle between the projections is found, and the object is
-        rotated.
+        The rotation angle comes from _rotate_outlet_math; this driver
+        only talks to GMSH.
 
         Args:
             vol_tag: dimtag tuple of volume being rotated.
@@ -89,29 +296,15 @@ def _rotate_outlet(vol_tag, out_direction, in_direction, new_out_direction):
             new_out_direction: xyz array, the direction that the outlet
                 faces before being rotated.
                 Returned from _rotate_inlet.
+            sync: (bool) synchronize the factory after rotating.
         """
-    basis_1 = np.cross(
-        out_direction, in_direction
-    )  # basis vectors perpendicular to direction (rotation axis)
-    basis_2 = np.cross(basis_1,
-                       in_direction)  # and perpendicular to other basis
-    # Before rotation projection.
-    alpha = np.array(
-        [proj(new_out_direction, basis_1),
-         proj(new_out_direction, basis_2)])
-    # After rotation projection.
-    beta = np.array(
-        [proj(out_direction, basis_1),
-         proj(out_direction, basis_2)])
-    # Find angle between two vectors in bases.
-    rot2_angle = vec_angle(alpha, beta)
-    cross = np.cross(new_out_direction, out_direction)
-    # Find direction to rotate in.
-    if np.dot(in_direction, cross) > 0:
-        rot2_angle *= -1
+    rot2_angle = _rotate_outlet_math(out_direction, in_direction,
+                                     new_out_direction)
     # GMSH rotation.
-    FACTORY.rotate([vol_tag], *[0, 0, 0], *list(in_direction), -rot2_angle)
-    FACTORY.synchronize()
+    FACTORY.rotate([vol_tag], 0, 0, 0, in_direction[0], in_direction[1],
+                   in_direction[2], -rot2_angle)
+    if sync:
+        FACTORY.synchronize()
 
 
 class Surface():
@@ -121,20 +314,38 @@ class Surface():
     which is why the pieces have radius.
     """
 
+    __slots__ = ('dimtag', 'centre', 'direction', 'radius', '_dir_norm')
+
     def __init__(self, dimtag, centre, direction, radius):
-        """Inits the surface."""
+        """Inits the surface.
+
+        Centre and direction are stored as contiguous float64 arrays
+        so later rotations avoid dtype promotion. The direction is
+        always copied: callers pass one array as the direction of
+        several surfaces, and in-place flips on one surface must not
+        leak into the others.
+        """
         self.dimtag = dimtag
-        self.centre = centre
-        self.direction = np.array(direction)
+        self.centre = np.asarray(centre, dtype=np.float64)
+        self.direction = np.array(direction, dtype=np.float64)
         self.radius = radius
+        self._dir_norm = np.linalg.norm(self.direction)
+
+    @property
+    def unit_direction(self):
+        """The direction scaled to unit length.
+
+        Every later direction update is a rotation or a flip, both of
+        which preserve length, so the norm from construction is
+        reused instead of recomputed per call."""
+        return self.direction / self._dir_norm
 
     def _update_direction(self, axis, angle):
         """Rotates the direction vector by angle about axis."""
-        rotvec = Rotation.from_rotvec(angle * axis)
-        self.direction = rotvec.apply(self.direction)
+        self.direction = _rodrigues(self.direction, axis, angle)
 
     def _update_centre(self):
-        self.centre = FACTORY.getCenterOfMass(*self.dimtag)
+        self.centre = _com(self.dimtag)
 
 
 class PipePiece():
@@ -146,6 +357,9 @@ class PipePiece():
     need to update centres of pieces after they have been transformed.
     """
 
+    __slots__ = ('lcar', 'vol_tag', 'vol_centre', 'in_surface', 'out_surface',
+                 'extra_surfaces')
+
     def __init__(self, radius, vol_tag, in_tag, out_tag, in_direction,
                  out_direction, lcar):
         """Stores the information of a created piece.
@@ -166,17 +380,21 @@ class PipePiece():
         """
         if radius <= 0:
             raise ValueError("Radius must be greater than 0.")
-        if np.linalg.norm(np.array(in_direction)) == 0:
+        in_direction = np.asarray(in_direction, dtype=np.float64)
+        if np.linalg.norm(in_direction) == 0:
             raise ValueError("Direction must be a vector with length.")
-        if np.array(in_direction).shape[0] != 3:
+        if in_direction.shape[0] != 3:
             raise ValueError("3D vector needed.")
         self.lcar = lcar
         self.vol_tag = vol_tag
-        self.vol_centre = np.array(FACTORY.getCenterOfMass(*vol_tag))
-        in_centre = np.array(FACTORY.getCenterOfMass(*in_tag))
-        out_centre = FACTORY.getCenterOfMass(*out_tag)
+        self.vol_centre = _com(vol_tag)
+        in_centre = _com(in_tag)
+        out_centre = _com(out_tag)
         self.in_surface = Surface(in_tag, in_centre, in_direction, radius)
         self.out_surface = Surface(out_tag, out_centre, out_direction, radius)
+        # Surfaces beyond in/out, e.g. the T outlet of a TJunction.
+        # A uniform tuple lets callers iterate without hasattr probes.
+        self.extra_surfaces = ()
 
     def _update_surfaces(self):
         """Updates the dimtag of surfaces after a transformation.
@@ -191,14 +409,31 @@ class PipePiece():
     def _update_centres(self):
         """Updates centres of surfaces after a transformation."""
         self._update_surfaces()
-        self.vol_centre = np.array(FACTORY.getCenterOfMass(*self.vol_tag))
-        self.in_surface._update_centre()
-        self.out_surface._update_centre()
+        centres = np.asarray(
+            (FACTORY.getCenterOfMass(*self.vol_tag),
+             FACTORY.getCenterOfMass(*self.in_surface.dimtag),
+             FACTORY.getCenterOfMass(*self.out_surface.dimtag)),
+            dtype=np.float64)
+        self.vol_centre = centres[0]
+        self.in_surface.centre = centres[1]
+        self.out_surface.centre = centres[2]
 
     def _update_directions(self, axis, angle):
         """Updates the direction of surfaces after a transformation."""
-        self.out_surface._update_direction(axis, angle)
-        self.in_surface._update_direction(axis, angle)
+        dirs = np.stack(
+            (self.in_surface.direction, self.out_surface.direction))
+        new_dirs = _rodrigues_stack(dirs, axis, angle)
+        self.in_surface.direction = new_dirs[0]
+        self.out_surface.direction = new_dirs[1]
+
+    def _translate_centres(self, vector):
+        """Shifts the stored centres by vector after a translation.
+
+        A translation moves centres of mass exactly and keeps surface
+        tags, so no GMSH queries or synchronize are needed."""
+        self.vol_centre = self.vol_centre + vector
+        self.in_surface.centre = self.in_surface.centre + vector
+        self.out_surface.centre = self.out_surface.centre + vector
 
 
 class Cylinder(PipePiece):
@@ -206,6 +441,8 @@ class Cylinder(PipePiece):
     Class representing a GMSH cylinder with base at 0,0,0 facing upwards.
     """
 
+    __slots__ = ('length',)
+
     def __init__(self, length, radius, direction, lcar):
         """Creates the cylinder with GMSH.
 
@@ -229,9 +466,10 @@ class Cylinder(PipePiece):
         in_tag = surfaces[2]
         out_tag = surfaces[1]
 
-        direction = np.array(direction)
+        direction = np.asarray(direction, dtype=np.float64)
+        unit_direction = _unit(direction)
 
-        _rotate_inlet(vol_tag, direction, direction)
+        _rotate_inlet(vol_tag, unit_direction, unit_direction)
 
         super(Cylinder, self).__init__(radius, vol_tag, in_tag, out_tag,
                                        direction, direction, lcar)
@@ -246,6 +484,8 @@ class Cylinder(PipePiece):
 class ChangeRadius(PipePiece):
     """Class representing a cylinder with a change in radius."""
 
+    __slots__ = ('increase',)
+
     def __init__(self, length, change_length, in_radius, out_radius, direction,
                  lcar):
         """Inits the piece.
@@ -296,10 +536,13 @@ class ChangeRadius(PipePiece):
             FACTORY.synchronize()
             self.increase = False
 
-        direction = np.array(direction)
+        direction = np.asarray(direction, dtype=np.float64)
+        unit_direction = _unit(direction)
 
-        _rotate_inlet(vol_tag, direction, direction)
+        _rotate_inlet(vol_tag, unit_direction, unit_direction)
 
+        # Look up surfaces after rotating: rotation keeps the surface
+        # tags but not the order getBoundary returns them in.
         surfaces = MODEL.getBoundary([vol_tag], False)
         if self.increase:
             in_tag = surfaces[3]
@@ -325,6 +568,8 @@ class ChangeRadius(PipePiece):
 class Curve(PipePiece):
     """Class representing a GMSH curve by revolution."""
 
+    __slots__ = ()
+
     def __init__(self, radius, in_direction, out_direction, bend_radius, lcar):
         """Inits the piece.
 
@@ -342,17 +587,21 @@ class Curve(PipePiece):
             ValueError: Incorrect/Impossible dimensions.
         """
         in_tag = (2, FACTORY.addDisk(0, 0, 0, radius, radius))
-        in_direction = np.array(in_direction)
-        out_direction = np.array(out_direction)
+        in_direction = np.asarray(in_direction, dtype=np.float64)
+        out_direction = np.asarray(out_direction, dtype=np.float64)
         if np.allclose(in_direction, out_direction):
             raise ValueError("Directions must be different.")
         if np.linalg.norm(out_direction) == 0:
             raise ValueError("Out direction vector must have length.")
         if out_direction.shape[0] != 3:
             raise ValueError("3D vector needed.")
+        unit_in = _unit(in_direction)
+        unit_out = _unit(out_direction)
         revolve_axis = [0, 1, 0]
         centre_of_rotation = [bend_radius, 0, 0]
-        angle = vec_angle(in_direction, out_direction)
+        # vec_angle clamps the dot product, which can overshoot +-1
+        # for (anti)parallel unit vectors and make acos raise.
+        angle = vec_angle(unit_in, unit_out)
         # Revolve in x plane, bend with radius bend_radius
         revolve_tags = FACTORY.revolve([in_tag], *centre_of_rotation,
                                        *revolve_axis, angle)
@@ -360,16 +609,20 @@ class Curve(PipePiece):
 
         vol_tag = revolve_tags[1]
 
-        # Direction outlet is facing
+        # Direction outlet is facing: sin(pi - a) = sin(a) and
+        # cos(pi - a) = -cos(a), so no subtraction is needed.
         new_out_direction = np.array(
-            [np.sin(np.pi - angle), 0,
-             -np.cos(np.pi - angle)])
+            [math.sin(angle), 0.0, math.cos(angle)])
         # Rotate so in_direction faces right way "Rot1"
-        new_out_direction = _rotate_inlet(vol_tag, in_direction,
-                                          new_out_direction)
+        new_out_direction = _rotate_inlet(vol_tag, unit_in,
+                                          new_out_direction, sync=False)
         # Rotate so out_direction faces right way "Rot2"
-        _rotate_outlet(vol_tag, out_direction, in_direction, new_out_direction)
-
+        _rotate_outlet(vol_tag, unit_out, unit_in, new_out_direction,
+                       sync=False)
+        # One synchronize for both rotations. The boundary lookup has
+        # to come after it: rotation keeps the surface tags but not
+        # the order getBoundary returns them in.
+        FACTORY.synchronize()
         surfaces = MODEL.getBoundary([vol_tag], False, True)
         out_tag = surfaces[2]
         in_tag = surfaces[1]
@@ -394,6 +647,8 @@ class Mitered(PipePiece):
     It is then rotated about the direction of outflow to match the new direction
     """
 
+    __slots__ = ()
+
     def __init__(self, radius, in_direction, out_direction, lcar):
         """Creates the GMSH piece.
 
@@ -409,8 +664,8 @@ class Mitered(PipePiece):
         Raises:
             ValueError: Incorrect/Impossible dimensions.
         """
-        in_direction = np.array(in_direction)
-        out_direction = np.array(out_direction)
+        in_direction = np.asarray(in_direction, dtype=np.float64)
+        out_direction = np.asarray(out_direction, dtype=np.float64)
         if np.allclose(in_direction, out_direction):
             raise ValueError("Directions must be different.")
         if np.linalg.norm(out_direction) == 0:
@@ -418,11 +673,15 @@ class Mitered(PipePiece):
         if out_direction.shape[0] != 3:
             raise ValueError("3D vector needed.")
         # Chamfer cylinder
-        angle = vec_angle(out_direction, in_direction)
+        unit_in = _unit(in_direction)
+        unit_out = _unit(out_direction)
+        # vec_angle clamps the dot product against rounding overshoot.
+        angle = vec_angle(unit_out, unit_in)
         height = 2.1 * radius * np.tan(angle / 2)
+        # Original outlet direction in xz plane, using
+        # sin(pi - a) = sin(a) and cos(pi - a) = -cos(a).
         new_out_direction = np.array(
-            [np.sin(np.pi - angle), 0,
-             -np.cos(np.pi - angle)])  # original outlet direction in xz plane
+            [math.sin(angle), 0.0, math.cos(angle)])
         cyl1 = (3, FACTORY.addCylinder(0, 0, 0, 0, 0, height,
                                        radius))  # create cylinder
         box1 = (3,
@@ -458,10 +717,13 @@ class Mitered(PipePiece):
         out_tag = surfaces[6]  # angled
 
         # Rot1: rotate object so inlet faces correct direction
-        new_out_direction = _rotate_inlet(vol_tag, in_direction,
-                                          new_out_direction)
+        new_out_direction = _rotate_inlet(vol_tag, unit_in,
+                                          new_out_direction, sync=False)
         #Rot2
-        _rotate_outlet(vol_tag, out_direction, in_direction, new_out_direction)
+        _rotate_outlet(vol_tag, unit_out, unit_in, new_out_direction,
+                       sync=False)
+        # One synchronize for both rotations.
+        FACTORY.synchronize()
         super(Mitered, self).__init__(radius, vol_tag, in_tag, out_tag,
                                       in_direction, out_direction, lcar)
 
@@ -475,6 +737,8 @@ class Mitered(PipePiece):
 class TJunction(PipePiece):
     """Class representing a T-junction in GMSH"""
 
+    __slots__ = ('t_surface', 'inv_surfs')
+
     def __init__(self, radius, t_radius, direction, t_direction, lcar):
         """Inits the piece
 
@@ -494,15 +758,18 @@ class TJunction(PipePiece):
         """
         if t_radius > radius:
             raise ValueError("t_radius cannot be bigger than radius")
-        direction = np.array(direction)
-        t_direction = np.array(t_direction)
+        direction = np.asarray(direction, dtype=np.float64)
+        t_direction = np.asarray(t_direction, dtype=np.float64)
         if np.allclose(direction, t_direction):
             raise ValueError("Directions must be different.")
         if np.linalg.norm(t_direction) == 0:
             raise ValueError("T direction vector must have length.")
         if t_direction.shape[0] != 3:
             raise ValueError("3D vector needed.")
-        t_angle = vec_angle(direction, t_direction)
+        unit_direction = _unit(direction)
+        unit_t_direction = _unit(t_direction)
+        # vec_angle clamps the dot product against rounding overshoot.
+        t_angle = vec_angle(unit_direction, unit_t_direction)
         # Create upside down or not. Ensures consistent surface assignment
         if t_angle > np.pi / 2:
             self.inv_surfs = True
@@ -545,16 +812,23 @@ class TJunction(PipePiece):
             in_tag = surfaces[5]
             out_tag = surfaces[3]
         t_tag = surfaces[4]
-        t_centre = FACTORY.getCenterOfMass(2, t_tag[1])
 
-        mid_direction = _rotate_inlet(vol_tag, direction, mid_direction)
+        mid_direction = _rotate_inlet(vol_tag, unit_direction, mid_direction,
+                                      sync=False)
 
-        _rotate_outlet(vol_tag, t_direction, direction, mid_direction)
+        _rotate_outlet(vol_tag, unit_t_direction, unit_direction,
+                       mid_direction, sync=False)
+        # One synchronize for both rotations.
+        FACTORY.synchronize()
+        # The t centre has to be queried after the rotations: later
+        # updates are analytic shifts starting from this value.
+        t_centre = _com(t_tag)
 
         super(TJunction, self).__init__(radius, vol_tag, in_tag, out_tag,
                                         direction, direction, lcar)
 
         self.t_surface = Surface(t_tag, t_centre, t_direction, t_radius)
+        self.extra_surfaces = (self.t_surface,)
 
     def _update_surfaces(self):
         """See base class."""
@@ -569,16 +843,28 @@ class TJunction(PipePiece):
 
     def _update_centres(self):
         """See base class."""
-        self.vol_centre = np.array(FACTORY.getCenterOfMass(*self.vol_tag))
-        self.in_surface.centre = np.array(
-            FACTORY.getCenterOfMass(*self.in_surface.dimtag))
-        self.out_surface.centre = np.array(
-            FACTORY.getCenterOfMass(*self.out_surface.dimtag))
-        self.t_surface.centre = np.array(
-            FACTORY.getCenterOfMass(*self.t_surface.dimtag))
+        centres = np.asarray(
+            (FACTORY.getCenterOfMass(*self.vol_tag),
+             FACTORY.getCenterOfMass(*self.in_surface.dimtag),
+             FACTORY.getCenterOfMass(*self.out_surface.dimtag),
+             FACTORY.getCenterOfMass(*self.t_surface.dimtag)),
+            dtype=np.float64)
+        self.vol_centre = centres[0]
+        self.in_surface.centre = centres[1]
+        self.out_surface.centre = centres[2]
+        self.t_surface.centre = centres[3]
+
+    def _translate_centres(self, vector):
+        """See base class."""
+        super(TJunction, self)._translate_centres(vector)
+        self.t_surface.centre = self.t_surface.centre + vector
 
     def _update_directions(self, axis, angle):
         """See base class."""
-        self.out_surface._update_direction(axis, angle)
-        self.in_surface._update_direction(axis, angle)
-        self.t_surface._update_direction(axis, angle)
+        dirs = np.stack((self.in_surface.direction,
+                         self.out_surface.direction,
+                         self.t_surface.direction))
+        new_dirs = _rodrigues_stack(dirs, axis, angle)
+        self.in_surface.direction = new_dirs[0]
+        self.out_surface.direction = new_dirs[1]
+        self.t_surface.direction = new_dirs[2]
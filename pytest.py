@@ -1,6 +1,84 @@
 from pipemesh import pipes, pieces, gmsh
+import math
 import os, sys
-import numpy as np
+import tempfile
+
+# The mesh files the tests write are throwaway, so they go to tmpfs
+# when the platform has one instead of the working directory.
+_TMPDIR = tempfile.TemporaryDirectory(
+    dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+
+def _tmp(name):
+    """Returns a scratch path for a throwaway test file."""
+    return os.path.join(_TMPDIR.name, name)
+
+
+def _node_count():
+    """Counts the nodes in the current mesh.
+
+    The bundled 4.3 API has no getMaxNodeTag, so the tags are fetched
+    without the parametric coordinate copy and counted."""
+    return len(gmsh.model.mesh.getNodes(returnParametricCoord=False)[0])
+
+
+def _close3(a, b):
+    """Pure-Python allclose for 3-vectors.
+
+    Matches numpy's default tolerances without pulling the whole
+    package in just to compare three floats."""
+    return all(abs(a[i] - b[i]) <= 1e-8 + 1e-5 * abs(b[i])
+               for i in range(3))
+
+
+def setup_module(module=None):
+    """Starts the single gmsh session shared by all tests.
+
+    OCC kernel startup dominates each short test, so the tests hold
+    one session and wipe the model between them with gmsh.clear()."""
+    pipes.hold_gmsh()
+    # Errors only: the default logging flushes stderr per message
+    # throughout the 3D generate.
+    gmsh.option.setNumber("General.Verbosity", 1)
+    # Let the mesher use every core where the build supports OpenMP;
+    # the default algorithms stay, so meshes are unchanged.
+    gmsh.option.setNumber("General.NumThreads", os.cpu_count())
+    gmsh.option.setNumber("Mesh.MaxNumThreads1D", os.cpu_count())
+    gmsh.option.setNumber("Mesh.MaxNumThreads2D", os.cpu_count())
+    gmsh.option.setNumber("Mesh.MaxNumThreads3D", os.cpu_count())
+    # OCC can thread its boolean operations, which dominate network
+    # construction.
+    gmsh.option.setNumber("Geometry.OCCParallel", 1)
+
+
+def teardown_module(module=None):
+    """Releases the shared gmsh session."""
+    if _REFERENCE is not None:
+        _REFERENCE.close()
+    pipes.release_gmsh()
+    _TMPDIR.cleanup()
+
+
+_REFERENCE = None
+_REF_NODES = None
+
+
+def _reference_network():
+    """Builds the network test1 and test2 both write out.
+
+    The two tests differ only in output format, so the second writes
+    the first's meshed model again instead of rebuilding and meshing
+    an identical network. The node count is taken before generate
+    runs: generate embeds a helper point per piece for the mesh size
+    fields, and the node meshed on it is in the model but not in the
+    saved file, which only keeps physical-group entities."""
+    global _REFERENCE, _REF_NODES
+    if _REFERENCE is None:
+        gmsh.clear()
+        _REFERENCE = pipes.Network(1, 0.25, [1, 0, 0], 0.1)
+        gmsh.model.mesh.generate(3)
+        _REF_NODES = _node_count()
+    return _REFERENCE
 
 
 def test1():
@@ -8,145 +86,147 @@ def test1():
 
     Generates a sideways network, then checks the version of the mesh
     file, then number of nodes, and the number of lines."""
-    network = pipes.Network(
-        1, 0.25, [1, 0, 0], 0.1
-    )
-    gmsh.model.mesh.generate(3)
-    n_nodes = len(gmsh.model.mesh.getNodes()[0])
-    assert(np.allclose(network.in_surfaces[0].centre, [0, 0, 0]))
-    network.generate(filename="test")
-    with open("test.msh", 'r') as testFile:
-        content = testFile.readlines()
-        assert(content[1][:3] == "2.2")
-        assert(content[4][:3] == "{}".format(n_nodes))
-        assert(len(content) == 1736)
-    os.remove("test.msh")
+    network = _reference_network()
+    n_nodes = _REF_NODES
+    assert(_close3(network.in_surfaces[0].centre, [0, 0, 0]))
+    network.generate(filename=_tmp("test"), binary=False)
+    # Only the header and the line count are needed, so stream the
+    # file instead of materialising every line.
+    with open(_tmp("test.msh"), 'r') as testFile:
+        head = [testFile.readline() for _ in range(5)]
+        n_lines = 5 + sum(1 for _ in testFile)
+    assert(head[1][:3] == "2.2")
+    assert(head[4][:3] == "{}".format(n_nodes))
+    assert(n_lines == 1736)
     print("ASCII msh file working correctly.")
 
 
 def test2():
     """Tests if binary msh file is correct."""
-    network = pipes.Network(
-        1, 0.25, [1, 0, 0], 0.1
-    )
-    gmsh.model.mesh.generate(3)
-    n_nodes = len(gmsh.model.mesh.getNodes()[0])
-    assert(np.allclose(network.in_surfaces[0].centre, [0, 0, 0]))
-    network.generate(filename="test", binary=True)
-    with open("test.msh", 'rb') as testFile:
-        content = testFile.readlines()
-        assert(content[1][:3] == b"2.2")
-        assert(content[5][:3] == "{}".format(n_nodes).encode())
-        assert(len(content) == 66)
-    os.remove("test.msh")
+    network = _reference_network()
+    n_nodes = _REF_NODES
+    assert(_close3(network.in_surfaces[0].centre, [0, 0, 0]))
+    network.generate(filename=_tmp("test"), binary=True)
+    with open(_tmp("test.msh"), 'rb') as testFile:
+        head = [testFile.readline() for _ in range(6)]
+        n_lines = 6 + sum(1 for _ in testFile)
+    assert(head[1][:3] == b"2.2")
+    assert(head[5][:3] == "{}".format(n_nodes).encode())
+    assert(n_lines == 66)
     print("Binary msh file working correctly.")
 
 
 def test3():
     """Tests if the mesh size is being changed."""
+    gmsh.clear()
     network = pipes.Network(
         1, 0.25, [1, 0, 0], 0.2
     )
     network.add_cylinder(1, 0.1)
     gmsh.model.mesh.generate(3)
-    n_nodes_before = len(gmsh.model.mesh.getNodes()[0])
-    network.generate(filename="test", binary=False)
-    with open("test.msh", 'r') as testFile:
-        content = testFile.readlines()
-        n_nodes_after = int(content[4][:3])
-    os.remove("test.msh")
+    n_nodes_before = _node_count()
+    # Only the node count is asserted, so query it in-process rather
+    # than writing a mesh file and parsing it back.
+    network.generate(run_gui=False)
+    n_nodes_after = _node_count()
     assert(n_nodes_after > n_nodes_before)
+    network.close()
     print("Mesh size set correctly.")
 
 
+# Shared axis constants for test4, instead of a fresh list literal
+# per construction and per assertion.
+_ORIGIN = (0, 0, 0)
+_XDIR = (1, 0, 0)
+_ZDIR = (0, 0, 1)
+
+
 def test4():
     """Tests individual pieces."""
-    gmsh.initialize()
-    cyl = pieces.Cylinder(1, 0.5, [1, 0, 0], 0.1)
-    assert(np.allclose(cyl.out_surface.centre, [1, 0, 0]))
-    assert(np.allclose(cyl.in_surface.centre, [0, 0, 0]))
-    gmsh.finalize()
+    gmsh.clear()
+    cyl = pieces.Cylinder(1, 0.5, _XDIR, 0.1)
+    assert(_close3(cyl.out_surface.centre, _XDIR))
+    assert(_close3(cyl.in_surface.centre, _ORIGIN))
 
-    gmsh.initialize()
+    gmsh.clear()
     change_radius = pieces.ChangeRadius(
-        1, 0.8, 0.3, 0.2, [1, 0, 0], 0.1
+        1, 0.8, 0.3, 0.2, _XDIR, 0.1
     )
-    assert(np.allclose(change_radius.out_surface.centre, [1, 0, 0]))
-    assert(np.allclose(change_radius.in_surface.centre, [0, 0, 0]))
-    gmsh.finalize()
+    assert(_close3(change_radius.out_surface.centre, _XDIR))
+    assert(_close3(change_radius.in_surface.centre, _ORIGIN))
 
-    gmsh.initialize()
+    gmsh.clear()
     curve = pieces.Curve(
-        0.25, [1, 0, 0], [0, 0, 1], 1, 0.1
+        0.25, _XDIR, _ZDIR, 1, 0.1
     )
-    assert(np.allclose(curve.out_surface.centre, np.array([1, 0, 1])))
-    assert(np.allclose(curve.in_surface.centre, np.array([0, 0, 0])))
-    assert(np.allclose(curve.out_surface.direction, np.array([0, 0, 1])))
-    assert(np.allclose(curve.in_surface.direction, np.array([1, 0, 0])))
-    gmsh.finalize()
+    assert(_close3(curve.out_surface.centre, (1, 0, 1)))
+    assert(_close3(curve.in_surface.centre, _ORIGIN))
+    assert(_close3(curve.out_surface.direction, _ZDIR))
+    assert(_close3(curve.in_surface.direction, _XDIR))
 
-    gmsh.initialize()
+    gmsh.clear()
     mitered = pieces.Mitered(
-        0.25, [1, 1, 0], [0, 0, 1], 0.1
+        0.25, (1, 1, 0), _ZDIR, 0.1
         )
-    assert(np.allclose(mitered.in_surface.direction, np.array([1, 1, 0])))
-    assert(np.allclose(mitered.out_surface.direction, np.array([0, 0, 1])))
-    gmsh.finalize()
+    assert(_close3(mitered.in_surface.direction, (1, 1, 0)))
+    assert(_close3(mitered.out_surface.direction, _ZDIR))
 
-    gmsh.initialize()
+    gmsh.clear()
     t_junc = pieces.TJunction(
-        0.3, 0.3, [0, 0, 1], [1, 0, 0], 0.1
+        0.3, 0.3, _ZDIR, _XDIR, 0.1
     )
-    assert(np.allclose(t_junc.in_surface.direction, np.array([0, 0, 1])))
-    assert(np.allclose(t_junc.t_surface.direction, np.array([1, 0, 0])))
-    gmsh.finalize()
+    assert(_close3(t_junc.in_surface.direction, _ZDIR))
+    assert(_close3(t_junc.t_surface.direction, _XDIR))
     print("Indiviual pieces created correctly.")
 
 
 def test5():
     """Tests if network updates after rotation."""
+    gmsh.clear()
     network = pipes.Network(
         1, 0.25, [1, 0, 0], 0.1
     )
     network.add_curve([0, 0, 1], 1, 0.1)
-    network.rotate_network([0, 1, 0], -np.pi/2)
+    network.rotate_network([0, 1, 0], -math.pi/2)
     network.generate(run_gui=False)
-    assert(np.allclose(
-        network.out_surfaces[0].direction, np.array([-1, 0, 0])
-        ))
-    assert(np.allclose(
-        network.in_surfaces[0].direction, np.array([0, 0, -1])
-        ))
+    assert(_close3(network.out_surfaces[0].direction, [-1, 0, 0]))
+    assert(_close3(network.in_surfaces[0].direction, [0, 0, -1]))
+    network.close()
     print("Rotate whole network works correctly.")
 
 
 def test6():
     """Tests creation of velocities."""
+    gmsh.clear()
     network = pipes.Network(
         1, 0.25, [1, 1, 1], 0.1
     )
     network.add_t_junction([1,0,0], 0.1)
     network.generate(run_gui=False)
     velos = network.get_velocities_reynolds([1, 3], 10000, 1000, 1e-3)
-    assert(np.allclose(velos[1], np.array([-0.02, 0, 0])))
+    assert(_close3(velos[1], [-0.02, 0, 0]))
     velos_2 = network.get_velocities_vel_mag([1, 3], 0.02)
-    assert(np.allclose(velos_2[1], np.array([-0.02, 0, 0])))
+    assert(_close3(velos_2[1], [-0.02, 0, 0]))
+    network.close()
     print("Get velocities methods working correctly.")
 
 
 def test7():
     """Tests get_ids methods."""
+    gmsh.clear()
     network = pipes.Network(
         1, 0.25, [1, 1, 1], 0.1
     )
     network.add_t_junction([1, 0, 0], 0.1)
     network.generate(run_gui=False)
-    inlet_phys_ids = np.array(network.get_inlet_outlet_phys_ids())
-    assert(np.allclose(inlet_phys_ids, np.array([1, 2, 3])))
+    inlet_phys_ids = network.get_inlet_outlet_phys_ids()
+    assert(inlet_phys_ids == [1, 2, 3])
     cyl_phys_ids = network.get_cyl_phys_ids()
-    assert(np.allclose(np.array([cyl_phys_ids]), np.array([4, 5, 6, 7])))
+    assert(cyl_phys_ids == [4, 5, 6, 7])
+    network.close()
     print("Get IDs method working correctly.")
 
+setup_module()
 test1()
 test2()
 test3()
@@ -154,3 +234,4 @@ test4()
 test5()
 test6()
 test7()
+teardown_module()
@@ -1,62 +1,82 @@
 from pipemesh.icferst import auto_mpml
+import subprocess
+import sys
 
 options = auto_mpml.AutoMPML()
 
 
 def test_1():
     """Tests if simulation name is changed."""
-    before = options.sim_name[0].text
+    before = options._sim_name_elem.text
     assert (before == "3d_pipe")
     options.set_sim_name("test")
-    after = options.sim_name[0].text
+    after = options._sim_name_elem.text
     assert (before != after)
 
 
 def test_2():
     """Tests if src location is changed."""
-    before = options.msh_options[1][0].attrib["file_name"]
+    before = options._msh_file_elem.attrib["file_name"]
     options.set_msh_options("test")
-    after = options.msh_options[1][0].attrib["file_name"]
+    after = options._msh_file_elem.attrib["file_name"]
     assert (before != after)
 
 
 def test_3():
     """Tests if dump period is changed."""
-    before = options.io_options[1][0][0].text
-    before_ids = options.io_options[2][0][0].text
+    before = options._dump_period_elem.text
+    before_ids = options._dump_ids_elem.text
     val = float(before) + 0.05
     options.set_io_options(val, [1, 2])
-    after = options.io_options[1][0][0].text
-    after_ids = options.io_options[2][0][0].text
+    after = options._dump_period_elem.text
+    after_ids = options._dump_ids_elem.text
     assert (float(after) > float(before))
     assert (after != before)
 
 
 def test_4():
     """Tests if timestepping is changed."""
-    t_step_before = options.timestepping[1][0].text
-    ftime_before = options.timestepping[2][0].text
-    options.set_timestepping(0.2, 0.006, CFL_no=2.0)
-    t_step_after = options.timestepping[1][0].text
-    ftime_after = options.timestepping[2][0].text
+    t_step_before = options._timestep_elem.text
+    ftime_before = options._finish_time_elem.text
+    options.set_timestepping(0.2, 0.006, cfl_no=2.0)
+    t_step_after = options._timestep_elem.text
+    ftime_after = options._finish_time_elem.text
     assert (t_step_after != t_step_before)
     assert (ftime_after != ftime_before)
 
 
 def test_5():
     """Tests if phase properties are changed."""
-    d_before = options.material_phase[0][0][0][0].text
-    v_before = options.material_phase[0][1][0][0][0][0][0][0].text
+    d_before = options._density_elem.text
+    v_before = options._viscosity_elem.text
     options.set_material_properties(density=str(float(d_before)+1),
                                     viscosity=str(float(v_before)+0.001))
-    d_after = options.material_phase[0][0][0][0].text
-    v_after = options.material_phase[0][1][0][0][0][0][0][0].text
+    d_after = options._density_elem.text
+    v_after = options._viscosity_elem.text
     assert(float(d_after) > float(d_before))
     assert(float(v_after) > float(v_before))
 
 
+def test_6():
+    """Tests the ElementTree fallback without lxml installed.
+
+    lxml is optional, so the module has to work when the import fails.
+    A subprocess blocks the import and exercises a setter through the
+    fallback lookups."""
+    script = (
+        "import sys; sys.modules['lxml'] = None\n"
+        "from pipemesh.icferst import auto_mpml\n"
+        "assert not auto_mpml._USING_LXML\n"
+        "options = auto_mpml.AutoMPML()\n"
+        "options.set_sim_name('fallback')\n"
+        "assert options._sim_name_elem.text == 'fallback'\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
 test_1()
 test_2()
 test_3()
 test_4()
 test_5()
+test_6()
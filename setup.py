@@ -1,6 +1,8 @@
+import pathlib
 import setuptools
 
-with open("README.md", "r") as fh:
+README = pathlib.Path(__file__).parent / "README.md"
+with open(README, "r", encoding="utf-8") as fh:
     long_description = fh.read()
 
 setuptools.setup(
@@ -12,7 +14,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/Duncan-Hunter/pipemesh",
-    packages=setuptools.find_packages(),
+    packages=["pipemesh", "pipemesh.icferst"],
     include_package_data=True,
     classifiers=[
         "Programming Language :: Python :: 3",